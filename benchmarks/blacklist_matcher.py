@@ -0,0 +1,92 @@
+"""Filtering a 20-server page against a large blacklist.
+
+Compares the compiled BlacklistMatcher with the plain set lookup the bot used
+before, and times incremental add/remove on the matcher.
+
+    python benchmarks/blacklist_matcher.py --entries 100000
+"""
+import argparse
+import random
+import time
+
+from stubs import make_page
+
+import bot
+
+
+def build_entries(count, rng):
+    entries = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.8:
+            entries.append(f"host{i}.blocked.example")
+        elif kind < 0.9:
+            entries.append(f"*.zone{i}.example")
+        elif kind < 0.97:
+            entries.append(f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24")
+        else:
+            entries.append(f"2001:db8:{i % 65536:x}::/48")
+    return entries
+
+
+def legacy_filter(servers, blacklist):
+    return [s for s in servers if s.get("hostname", "").lower() not in blacklist]
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    entries = build_entries(args.entries, rng)
+    servers = make_page(1)["servers"]
+    # Mix in hosts that hit each kind of entry
+    exact = next(e for e in entries if e.startswith("host"))
+    wildcard = next(e for e in entries if e.startswith("*."))
+    ipv6 = next(e for e in reversed(entries) if ":" in e)
+    servers[0]["hostname"] = exact
+    servers[1]["hostname"] = "play" + wildcard[1:] + ":25565"
+    servers[2]["hostname"] = ipv6.split("/")[0].replace("::", "::1")
+    records = [bot.ServerRecord.from_api(server) for server in servers]
+
+    start = time.perf_counter()
+    legacy = set(entries)
+    legacy_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = bot.BlacklistMatcher(entries)
+    matcher.matches("warmup.example")
+    matcher_build = time.perf_counter() - start
+    bot.BLACKLISTED_IPS = matcher
+
+    legacy_time = per_call(lambda: legacy_filter(servers, legacy), args.repeat)
+    matcher_time = per_call(lambda: bot.filter_blacklisted_servers(records), args.repeat)
+
+    def churn():
+        matcher.add("churn.example")
+        matcher.remove("churn.example")
+        matcher.add("*.churn.example")
+        matcher.remove("*.churn.example")
+
+    churn_time = per_call(churn, args.repeat) / 4
+
+    print(f"{args.entries} entries, {len(servers)} servers per page")
+    print(f"{'approach':<10}{'build ms':>10}{'filter us':>11}{'kept':>6}")
+    print(f"{'set':<10}{legacy_build * 1e3:>10.1f}{legacy_time * 1e6:>11.1f}"
+          f"{len(legacy_filter(servers, legacy)):>6}")
+    print(f"{'matcher':<10}{matcher_build * 1e3:>10.1f}{matcher_time * 1e6:>11.1f}"
+          f"{len(bot.filter_blacklisted_servers(records)):>6}")
+    print(f"matcher add/remove: {churn_time * 1e6:.2f} us per change")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Minimal discord.Interaction stand-in for calling command and button callbacks directly."""
+import time
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    def is_done(self):
+        return self._interaction.deferred_at is not None or bool(self._interaction.messages)
+
+    async def defer(self, **kwargs):
+        self._interaction.deferred_at = time.perf_counter()
+
+    async def send_message(self, content=None, **kwargs):
+        self._interaction.record(content, kwargs)
+
+    async def edit_message(self, **kwargs):
+        self._interaction.record(None, kwargs)
+
+
+class FakeMessage:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def edit(self, **kwargs):
+        self._interaction.record(None, kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self._interaction.record(content, kwargs)
+        return FakeMessage(self._interaction)
+
+
+class FakeInteraction:
+    guild = None
+    user = None
+
+    def __init__(self):
+        self.created_at = time.perf_counter()
+        self.deferred_at = None
+        self.messages = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, **kwargs):
+        self.record(None, kwargs)
+
+    def record(self, content, kwargs):
+        self.messages.append((time.perf_counter(), content, kwargs))
+
+    @property
+    def latency(self):
+        """Seconds from creation until the last message was sent."""
+        if not self.messages:
+            return None
+        return self.messages[-1][0] - self.created_at
+
+
+async def click(view, label, interaction=None):
+    """Press the button labelled label on view, the way discord.py dispatches a component click."""
+    interaction = interaction or FakeInteraction()
+    for item in view.children:
+        if getattr(item, "label", None) == label:
+            await item.callback(interaction)
+            return interaction
+    raise LookupError(f"no button labelled {label!r} on {type(view).__name__}")
+
+
+def last_view(interaction):
+    """View attached to the most recent message or edit of interaction, if any."""
+    for _, _, kwargs in reversed(interaction.messages):
+        if kwargs.get("view") is not None:
+            return kwargs["view"]
+    return None
@@ -0,0 +1,81 @@
+"""Embed construction cost per results page.
+
+Compares the inline per-server auth_map code the commands used to carry with
+the shared renderer.
+
+    python benchmarks/embed_render.py --pages 100
+"""
+import argparse
+import time
+
+import discord
+
+from stubs import make_page
+
+import bot
+
+
+def legacy_page_embed(servers, page, start):
+    embed = discord.Embed(title=f"Server Search Results - Page {page}", color=discord.Color.blue())
+    for i, server in enumerate(servers, start=start + 1):
+        ip = server.get("hostname")
+        geo = server.get("geolocation", {})
+        auth = server.get("authMode", -1)
+        auth_map = {
+            0: ":cross_mark: Offline (Cracked)",
+            1: ":white_check_mark: Online Mode",
+            2: ":lock: Whitelisted",
+            -1: ":question: Unknown"
+        }
+        if isinstance(auth, str):
+            auth_map.update({
+                "Offline": ":cross_mark: Offline (Cracked)",
+                "Online": ":white_check_mark: Online Mode",
+                "Whitelist": ":lock: Whitelisted"
+            })
+        embed.add_field(
+            name=f"Server {i}",
+            value=(
+                f"**IP:** {ip}\n"
+                f"**Location:** {geo.get('city','Unknown')}, {geo.get('country','Unknown')}\n"
+                f"**Authentication:** {auth_map.get(auth, ':question: Unknown')}"
+            ),
+            inline=False
+        )
+    return embed
+
+
+def per_page(render, slices):
+    start = time.perf_counter()
+    for page, first, servers in slices:
+        render(servers, page, first)
+    return (time.perf_counter() - start) / len(slices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100, help="API pages to render, 4 slices of 5 each")
+    args = parser.parse_args()
+
+    slices, record_slices = [], []
+    for page in range(1, args.pages + 1):
+        servers = make_page(page)["servers"]
+        # The bot parses records once per API response, outside the render path
+        records = [bot.ServerRecord.from_api(server) for server in servers]
+        for first in range(0, len(servers), 5):
+            slices.append((page, first, servers[first:first + 5]))
+            record_slices.append((page, first, records[first:first + 5]))
+
+    def shared(servers, page, first):
+        return bot.results_embed(f"Server Search Results - Page {page}", servers, first_number=first + 1)
+
+    legacy = per_page(legacy_page_embed, slices)
+    current = per_page(shared, record_slices)
+
+    print(f"{'renderer':<16}{'us / 5-server slice':>22}")
+    print(f"{'inline auth_map':<16}{legacy * 1e6:>22.1f}")
+    print(f"{'shared':<16}{current * 1e6:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Per-lookup latency of each geolocation path.
+
+Compares the ip-api provider (against a local stub), the SQLite store, the
+in-memory cache and, when --mmdb points at a MaxMind-format database and the
+maxminddb package is installed, the offline MMDB provider.
+
+    python benchmarks/geo_providers.py --mmdb GeoLite2-City.mmdb --lookups 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from stubs import FakeIpApi, StubThread
+
+import bot
+
+
+async def time_lookups(lookup, ips):
+    start = time.perf_counter()
+    for ip in ips:
+        await lookup(ip)
+    return (time.perf_counter() - start) / len(ips)
+
+
+def report(name, seconds):
+    print(f"{name:<16}{seconds * 1e6:>14.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mmdb", help="path to a MaxMind-format .mmdb database")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub ip-api latency in seconds")
+    args = parser.parse_args()
+
+    ips = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(args.lookups)]
+    network_ips = ips[:max(1, args.lookups // 20)]
+
+    stubs = StubThread()
+    geo_api = FakeIpApi(latency=args.latency)
+    bot.GEO_API_URL = stubs.run(geo_api.start())
+    bot.GEO_BATCH_URL = geo_api.batch_url
+    workdir = tempfile.mkdtemp()
+    store = bot.GeoStore(os.path.join(workdir, "geo.sqlite3"), ttl=3600)
+
+    print(f"{'provider':<16}{'us / lookup':>14}")
+    try:
+        ip_api = bot.IpApiProvider(bot.geo_batcher)
+        report("ip-api (stub)", await time_lookups(ip_api.lookup, network_ips))
+
+        for ip in ips:
+            store._put(ip, {"country": "Finland", "city": "Helsinki"})
+        report("sqlite store", await time_lookups(store.get, ips))
+
+        cache = bot.TTLCache(3600, len(ips))
+        for ip in ips:
+            cache.set(ip, {"country": "Finland", "city": "Helsinki"})
+        report("memory cache", await time_lookups(lambda ip: cache.get_or_load(ip, None), ips))
+
+        if args.mmdb:
+            mmdb = bot.MMDBProvider(args.mmdb)
+            report("mmdb", await time_lookups(mmdb.lookup, ips))
+            mmdb.close()
+        else:
+            print(f"{'mmdb':<16}{'skipped (no --mmdb)':>14}")
+    finally:
+        store.close()
+        await bot.close_http_session()
+        stubs.run(geo_api.stop())
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
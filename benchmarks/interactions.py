@@ -0,0 +1,161 @@
+"""p50/p99 latency and throughput of /server, pagination, /random and /mcinfo under concurrent users.
+
+Everything runs offline: a stub mcscans API (synthetic pages, or recorded ones with
+--fixtures), a stub ip-api and local fake Java servers answering status and query.
+Each of N users sends --requests interactions one after another, all users at once,
+through the real command and button callbacks with fake discord.Interaction objects.
+Latency is the time until the user sees an answer, the first message or edit.
+Caches are cleared before every round, so each round starts cold.
+
+    python benchmarks/interactions.py --users 1 10 50 --latency 0.1
+    python benchmarks/interactions.py --fixtures benchmarks/fixtures --error-rate 0.05 --scenarios server page
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from driver import FakeInteraction, click, last_view
+from stubs import FakeIpApi, FakeJavaServer, FakeMcscansAPI, StubThread
+
+import bot
+
+
+def percentile(values, fraction):
+    # Nearest rank, so p99 of a small round is its slowest interaction rather than an interpolation
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def answered(interaction):
+    """Seconds until the first message or edit, or None if the user never got one."""
+    if not interaction.messages:
+        return None
+    return interaction.messages[0][0] - interaction.created_at
+
+
+async def server_user(requests, rng, context):
+    latencies = []
+    for _ in range(requests):
+        interaction = FakeInteraction()
+        await bot.server_cmd.callback(interaction, page=rng.randint(1, context["pages"]))
+        latencies.append(answered(interaction))
+    return latencies
+
+
+async def page_user(requests, rng, context):
+    # Opening the search is setup; only the Next clicks are timed, four per page
+    opened = FakeInteraction()
+    await bot.server_cmd.callback(opened, page=rng.randint(1, context["pages"]))
+    view = last_view(opened)
+    if view is None:
+        return [None] * requests
+    latencies = []
+    for _ in range(requests):
+        latencies.append(answered(await click(view, "Next")))
+    view.stop()
+    return latencies
+
+
+async def random_user(requests, rng, context):
+    latencies = []
+    for _ in range(requests):
+        interaction = FakeInteraction()
+        await bot.random_cmd.callback(interaction)
+        latencies.append(answered(interaction))
+    return latencies
+
+
+async def mcinfo_user(requests, rng, context):
+    latencies = []
+    for _ in range(requests):
+        interaction = FakeInteraction()
+        await bot.mcinfo.callback(interaction, ip=rng.choice(context["hosts"]))
+        latencies.append(answered(interaction))
+    return latencies
+
+
+SCENARIOS = {
+    "server": server_user,
+    "page": page_user,
+    "random": random_user,
+    "mcinfo": mcinfo_user,
+}
+
+
+def reset_caches():
+    bot.page_cache.clear()
+    bot.geo_cache.clear()
+    bot.probe_cache = bot.ProbeCache()
+    # Nothing refills the reservoir here, so /random tops it up inline like right after startup
+    bot.reservoir = bot.ServerReservoir(bot.RESERVOIR_SIZE, bot.RESERVOIR_MAX_AGE, bot.RESERVOIR_REPEAT_WINDOW)
+
+
+async def run_round(scenario, users, requests, context, seed):
+    reset_caches()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        SCENARIOS[scenario](requests, random.Random(seed * 10_007 + user), context)
+        for user in range(users)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for user in results for latency in user]
+    answers = [latency for latency in latencies if latency is not None]
+    return elapsed, answers, len(latencies) - len(answers)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=10, help="interactions per user and round")
+    parser.add_argument("--latency", type=float, default=0.1, help="delay of each stub answer in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random API delay, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of API requests answered with HTTP 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="share of API requests that outlast the bot's timeout")
+    parser.add_argument("--fixtures", help="directory of recorded API pages to replay")
+    parser.add_argument("--pages", type=int, default=50, help="result pages the simulated users start on")
+    parser.add_argument("--hosts", type=int, default=10, help="fake Minecraft servers for /mcinfo")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stubs = StubThread()
+    api = FakeMcscansAPI(latency=args.latency, total_servers=args.pages * bot.API_PAGE_SIZE,
+                         fixtures=args.fixtures, jitter=args.jitter, error_rate=args.error_rate,
+                         stall_rate=args.stall_rate, stall=bot.HTTP_TIMEOUT + 1, seed=args.seed)
+    geo_api = FakeIpApi(latency=args.latency)
+    java_servers = [FakeJavaServer(latency=args.latency) for _ in range(args.hosts)]
+    bot.API_URL = stubs.run(api.start())
+    bot.GEO_API_URL = stubs.run(geo_api.start())
+    bot.GEO_BATCH_URL = geo_api.batch_url
+    bot.geo_store = bot.GeoStore(":memory:", ttl=0)
+    context = {
+        "pages": len(api.fixtures) if api.fixtures else args.pages,
+        "hosts": [stubs.run(server.start()) for server in java_servers],
+    }
+    # /random sizes its page range from the total, as the bot does once it has seen the API
+    await bot.server_stats.get()
+
+    print(f"API latency {args.latency:.3f} s (+{args.jitter:.3f} jitter), "
+          f"{args.error_rate:.0%} errors, {args.stall_rate:.0%} stalls, {args.requests} requests per user")
+    print(f"{'scenario':<10}{'users':>6}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}{'failed':>8}{'API calls':>11}")
+    try:
+        for scenario in args.scenarios:
+            for users in args.users:
+                calls = api.requests
+                elapsed, answers, failed = await run_round(scenario, users, args.requests, context, args.seed)
+                p50 = f"{percentile(answers, 0.50) * 1000:.1f}" if answers else "-"
+                p99 = f"{percentile(answers, 0.99) * 1000:.1f}" if answers else "-"
+                print(f"{scenario:<10}{users:>6}{p50:>9}{p99:>9}{len(answers) / elapsed:>9.1f}"
+                      f"{failed:>8}{api.requests - calls:>11}")
+    finally:
+        await bot.close_http_session()
+        for server in java_servers:
+            stubs.run(server.stop())
+        stubs.run(geo_api.stop())
+        stubs.run(api.stop())
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Concurrent /server load test against a local mcscans stub.
+
+Compares the current async HTTP path with the old blocking requests.get
+path by patching fetch_server_page back to a blocking call. Every user asks
+for a different page, so the page cache can't merge their requests and both
+paths make one upstream call per user.
+
+    python benchmarks/load_server.py --latency 0.1 --users 1 5 10 25 50
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.parse
+import urllib.request
+
+from driver import FakeInteraction
+from stubs import FakeMcscansAPI, StubThread
+
+import bot
+
+
+async def blocking_fetch_server_page(page=1, **params):
+    # Reproduces the old behaviour: a synchronous HTTP call on the event loop.
+    params["page"] = page
+    url = f"{bot.API_URL}?{urllib.parse.urlencode(params)}"
+    with urllib.request.urlopen(url, timeout=bot.HTTP_TIMEOUT) as response:
+        servers = json.loads(response.read()).get("servers", [])
+    return bot.filter_blacklisted_servers([bot.ServerRecord.from_api(server) for server in servers]), len(servers)
+
+
+async def measure_loop_lag(stop, interval=0.01):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_round(users, api):
+    bot.page_cache.clear()
+    calls = api.requests
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    interactions = [FakeInteraction() for _ in range(users)]
+    start = time.perf_counter()
+    await asyncio.gather(*(bot.server_cmd.callback(i, page=page) for page, i in enumerate(interactions, start=1)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag = await lag_task
+    latencies = sorted(i.latency for i in interactions)
+    return elapsed, latencies[len(latencies) // 2], latencies[-1], lag, api.requests - calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="stub API latency in seconds")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    args = parser.parse_args()
+
+    stubs = StubThread()
+    api = FakeMcscansAPI(latency=args.latency)
+    bot.API_URL = stubs.run(api.start())
+    original = bot.fetch_server_page
+
+    print(f"{'mode':<10}{'users':>6}{'wall s':>9}{'req/s':>9}{'p50 s':>9}{'max s':>9}{'loop lag s':>12}{'API calls':>11}")
+    try:
+        for mode, fetch in (("blocking", blocking_fetch_server_page), ("async", original)):
+            bot.fetch_server_page = fetch
+            for users in args.users:
+                elapsed, p50, worst, lag, calls = await run_round(users, api)
+                print(f"{mode:<10}{users:>6}{elapsed:>9.3f}{users / elapsed:>9.1f}"
+                      f"{p50:>9.3f}{worst:>9.3f}{lag:>12.3f}{calls:>11}")
+    finally:
+        bot.fetch_server_page = original
+        await bot.close_http_session()
+        stubs.run(api.stop())
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
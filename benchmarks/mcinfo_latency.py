@@ -0,0 +1,94 @@
+"""/mcinfo latency with local fake Minecraft status/query servers and a fake geo API.
+
+Runs the old sequential blocking probe sequence (lookup, status, query, geo)
+next to the current /mcinfo callback and prints time-to-first-embed and
+time-to-complete for both. The current callback is also timed against a fake
+Bedrock server, where the Java probe loses the race and query and geo restart
+for the Bedrock target.
+
+    python benchmarks/mcinfo_latency.py --latency 0.1 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+
+from mcstatus import JavaServer
+
+from driver import FakeInteraction
+from stubs import FakeBedrockServer, FakeIpApi, FakeJavaServer, StubThread
+
+import bot
+
+
+def legacy_mcinfo(address):
+    # The probe sequence /mcinfo used to run, one blocking call after another.
+    server = JavaServer.lookup(address)
+    status = server.status()
+    try:
+        players = server.query().players.list
+    except Exception:
+        players = []
+    with urllib.request.urlopen(f"{bot.GEO_API_URL}{address}", timeout=5) as response:
+        geo = json.loads(response.read())
+    return status, players, geo
+
+
+async def run_current(address):
+    # Measure the probes, not the geolocation or probe caches
+    bot.geo_cache.clear()
+    bot.probe_cache = bot.ProbeCache()
+    interaction = FakeInteraction()
+    await bot.mcinfo.callback(interaction, ip=address)
+    first = interaction.messages[0][0] - interaction.created_at
+    return first, interaction.latency
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="delay of each fake probe in seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    stubs = StubThread()
+    geo_api = FakeIpApi(latency=args.latency)
+    java = FakeJavaServer(latency=args.latency)
+    bedrock = FakeBedrockServer(latency=args.latency)
+    bot.GEO_API_URL = stubs.run(geo_api.start())
+    bot.geo_store = bot.GeoStore(":memory:", ttl=0)
+    address = stubs.run(java.start())
+    bedrock_address = stubs.run(bedrock.start())
+
+    try:
+        legacy = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            legacy_mcinfo(address)
+            legacy.append(time.perf_counter() - start)
+
+        rows = {}
+        for path, target in (("concurrent", address), ("bedrock", bedrock_address)):
+            first, complete = [], []
+            for _ in range(args.rounds):
+                shown, done = await run_current(target)
+                first.append(shown)
+                complete.append(done)
+            rows[path] = statistics.median(first), statistics.median(complete)
+
+        print(f"{'path':<12}{'first embed s':>15}{'complete s':>12}")
+        print(f"{'sequential':<12}{statistics.median(legacy):>15.3f}{statistics.median(legacy):>12.3f}")
+        for path, (first, complete) in rows.items():
+            print(f"{path:<12}{first:>15.3f}{complete:>12.3f}")
+        print(f"Bedrock status pings answered: {bedrock.status_requests}")
+    finally:
+        await bot.close_http_session()
+        stubs.run(java.stop())
+        stubs.run(bedrock.stop())
+        stubs.run(geo_api.stop())
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Parse time and peak memory for one API page, per decoding path.
+
+Compares decoding the whole body the way response.json() does with the streaming
+ServerPageParser and, when orjson is installed, the OrjsonPageParser. Every path ends
+with the same blacklist-filtered ServerRecords.
+
+Pages come from --fixtures, a directory of recorded API responses (*.json). Record
+them once with --record, which saves pages from bot.API_URL, or leave --fixtures out
+to use synthetic pages from the stub.
+
+    python benchmarks/parse_pages.py --record benchmarks/fixtures --pages 20
+    python benchmarks/parse_pages.py --fixtures benchmarks/fixtures
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+import urllib.parse
+import urllib.request
+
+from stubs import load_fixtures, make_page
+
+import bot
+
+CHUNK_SIZE = 16 * 1024  # roughly what a socket read hands to aiohttp
+
+
+def record(directory, pages):
+    os.makedirs(directory, exist_ok=True)
+    for page in range(1, pages + 1):
+        url = f"{bot.API_URL}?{urllib.parse.urlencode({'page': page})}"
+        with urllib.request.urlopen(url, timeout=bot.HTTP_TIMEOUT) as response:
+            body = response.read()
+        with open(os.path.join(directory, f"page_{page:04d}.json"), "wb") as file:
+            file.write(body)
+    print(f"recorded {pages} pages into {directory}")
+
+
+def load_bodies(directory, pages):
+    if directory:
+        return load_fixtures(directory)
+    return [json.dumps(make_page(page)).encode() for page in range(1, pages + 1)]
+
+
+def whole_body(body, matcher):
+    data = json.loads(body)
+    servers = data.get("servers", [])
+    return bot.filter_blacklisted_servers([bot.ServerRecord.from_api(server) for server in servers])
+
+
+def streamed(parser_class):
+    def parse(body, matcher):
+        parser = parser_class(matcher)
+        for start in range(0, len(body), CHUNK_SIZE):
+            parser.feed(body[start:start + CHUNK_SIZE])
+        return parser.close()[0]
+    return parse
+
+
+def measure(parse, bodies, matcher, repeat):
+    # Best round of repeat, the machine is rarely quiet for the whole run
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in bodies:
+            parse(body, matcher)
+        best = min(best, time.perf_counter() - start)
+    per_page = best / len(bodies)
+
+    peak = 0
+    for body in bodies:
+        tracemalloc.start()
+        parse(body, matcher)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return per_page, peak, sum(len(parse(body, matcher)) for body in bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="directory of recorded API pages")
+    parser.add_argument("--record", metavar="DIR", help="record pages from bot.API_URL into DIR and exit")
+    parser.add_argument("--pages", type=int, default=50, help="pages to record or synthesize")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.pages)
+        return
+
+    bodies = load_bodies(args.fixtures, args.pages)
+    # Blacklist roughly one server in ten so filtering has something to drop
+    hosts = [server.get("hostname", "") for body in bodies for server in json.loads(body).get("servers", [])]
+    matcher = bot.BlacklistMatcher(hosts[::10])
+    bot.BLACKLISTED_IPS = matcher
+
+    paths = [("response.json()", whole_body), ("stream", streamed(bot.ServerPageParser))]
+    if bot.orjson_installed():
+        paths.append(("orjson", streamed(bot.OrjsonPageParser)))
+
+    size = sum(len(body) for body in bodies) / len(bodies)
+    print(f"{len(bodies)} pages, {size / 1024:.1f} KiB average, {len(hosts)} servers")
+    print(f"{'parser':<17}{'us / page':>11}{'peak KiB':>10}{'kept':>7}")
+    for name, parse in paths:
+        per_page, peak, kept = measure(parse, bodies, matcher, args.repeat)
+        print(f"{name:<17}{per_page * 1e6:>11.1f}{peak / 1024:>10.1f}{kept:>7}")
+
+
+if __name__ == "__main__":
+    main()
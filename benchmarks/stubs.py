@@ -0,0 +1,344 @@
+"""Local stand-ins for the upstream services bot.py talks to."""
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import threading
+
+from aiohttp import web
+
+# Let the benchmark scripts import bot.py from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGE_SIZE = 20
+
+
+def make_server(index, rng):
+    return {
+        "hostname": f"mc{index}.example.net",
+        "version": rng.choice(["1.20.1", "1.20.4", "1.21", "1.8.9"]),
+        "software": rng.choice(["Paper", "Spigot", "Vanilla", "Purpur"]),
+        "authMode": rng.choice([0, 1, 2, -1]),
+        "playerStats": {
+            "onlinePlayers": rng.randint(0, 200),
+            "maxPlayers": rng.choice([20, 50, 100, 500]),
+        },
+        "geolocation": {"country": "Finland", "city": "Helsinki"},
+        # Fields the real API sends that the bot never displays
+        "ip": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+        "port": 25565,
+        "protocol": rng.choice([47, 763, 765, 767]),
+        "motd": {"raw": f"\u00a7aWelcome to server {index}!\n\u00a77Survival | Minigames | Events", "clean": f"Welcome to server {index}! Survival | Minigames | Events"},
+        "favicon": "data:image/png;base64," + "A" * rng.choice([0, 0, 2048]),
+        "players": [{"name": f"player{index}_{n}", "uuid": f"{index:08x}-0000-4000-8000-{n:012x}"} for n in range(rng.randint(0, 12))],
+        "firstSeen": "2024-01-01T00:00:00Z",
+        "lastSeen": "2025-06-01T12:00:00Z",
+        "tags": rng.sample(["survival", "pvp", "creative", "modded", "smp", "skyblock"], 2),
+    }
+
+
+def make_page(page, total_servers=100_000, seed=0):
+    rng = random.Random(seed * 1_000_003 + page)
+    first = (page - 1) * PAGE_SIZE
+    count = max(0, min(PAGE_SIZE, total_servers - first))
+    return {
+        "totalServers": total_servers,
+        "servers": [make_server(first + i, rng) for i in range(count)],
+    }
+
+
+def load_fixtures(directory):
+    """Raw bodies of the recorded API pages in directory, in file name order."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+    if not paths:
+        raise SystemExit(f"no *.json fixtures in {directory}")
+    bodies = []
+    for path in paths:
+        with open(path, "rb") as file:
+            bodies.append(file.read())
+    return bodies
+
+
+class StubThread:
+    """Runs stub servers on their own event loop so a blocked bot loop can't stall them."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+class FakeMcscansAPI:
+    """Serves /public/v1/servers pages with a configurable delay and injected failures.
+
+    Pages are synthetic unless fixtures names a directory of recorded API responses
+    (*.json, see parse_pages.py --record), which are replayed in file name order; pages
+    past the last fixture come back empty. error_rate answers that share of requests with
+    error_status (and a Retry-After header when retry_after is set), stall_rate holds that share for stall seconds (past the bot's timeout),
+    and jitter adds up to that many seconds of random delay. seed makes a run repeatable.
+    """
+
+    def __init__(self, latency=0.05, total_servers=100_000, fixtures=None, jitter=0.0,
+                 error_rate=0.0, error_status=503, retry_after=None, stall_rate=0.0, stall=30.0, seed=0):
+        self.latency = latency
+        self.total_servers = total_servers
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.rng = random.Random(seed)
+        self.fixtures = load_fixtures(fixtures) if fixtures else None
+        self.requests = 0
+        self.errors = 0
+        self.stalls = 0
+        self._runner = None
+        self.url = None
+
+    def body(self, page):
+        if self.fixtures is None:
+            return json.dumps(make_page(page, self.total_servers)).encode()
+        if 1 <= page <= len(self.fixtures):
+            return self.fixtures[page - 1]
+        return json.dumps({"totalServers": self.total_servers, "servers": []}).encode()
+
+    async def handle_servers(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            headers = {} if self.retry_after is None else {"Retry-After": str(self.retry_after)}
+            return web.json_response({"error": "injected"}, status=self.error_status, headers=headers)
+        if roll < self.error_rate + self.stall_rate:
+            self.stalls += 1
+            await asyncio.sleep(self.stall)
+        page = int(request.query.get("page", 1))
+        return web.Response(body=self.body(page), content_type="application/json")
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/public/v1/servers", self.handle_servers)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}/public/v1/servers"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeIpApi:
+    """Answers ip-api.com style /json/<ip> lookups with a configurable delay."""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.requests = 0
+        self._runner = None
+        self.url = None
+
+    async def handle_lookup(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return web.json_response({"status": "success", "country": "Finland", "city": "Helsinki",
+                                  "query": request.match_info["ip"]})
+
+    async def handle_batch(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        queries = await request.json()
+        return web.json_response([{"status": "success", "country": "Finland", "city": "Helsinki",
+                                   "query": query["query"]} for query in queries])
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/json/{ip}", self.handle_lookup)
+        app.router.add_post("/batch", self.handle_batch)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}/json/"
+        self.batch_url = f"http://{host}:{port}/batch"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+async def _read_varint(reader):
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value
+    raise ValueError("varint too long")
+
+
+class _QueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        asyncio.ensure_future(self.server.answer_query(self.transport, data, addr))
+
+
+class FakeJavaServer:
+    """Java edition status (TCP) and query (UDP) responder on one port number."""
+
+    def __init__(self, latency=0.05, query_latency=None, players=("Steve", "Alex")):
+        self.latency = latency
+        self.query_latency = latency if query_latency is None else query_latency
+        self.players = list(players)
+        self.status_requests = 0
+        self.query_requests = 0
+        self._tcp = None
+        self._udp = None
+        self.address = None
+
+    def status_json(self):
+        return {
+            "version": {"name": "Paper 1.20.4", "protocol": 765},
+            "players": {"online": len(self.players), "max": 100},
+            "description": {"text": "A fake benchmark server"},
+        }
+
+    async def handle_status(self, reader, writer):
+        try:
+            while True:
+                length = await _read_varint(reader)
+                packet = await reader.readexactly(length)
+                packet_id = packet[0]
+                if packet_id == 0 and length == 1:
+                    self.status_requests += 1
+                    await asyncio.sleep(self.latency)
+                    body = json.dumps(self.status_json()).encode()
+                    payload = _varint(0) + _varint(len(body)) + body
+                    writer.write(_varint(len(payload)) + payload)
+                    await writer.drain()
+                elif packet_id == 1:
+                    writer.write(_varint(length) + packet)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def answer_query(self, transport, data, addr):
+        if data[:2] != b"\xfe\xfd":
+            return
+        packet_type, session = data[2], data[3:7]
+        await asyncio.sleep(self.query_latency)
+        if packet_type == 9:
+            transport.sendto(b"\x09" + session + b"9513307\x00", addr)
+            return
+        self.query_requests += 1
+        pairs = {
+            "hostname": "A fake benchmark server", "gametype": "SMP", "game_id": "MINECRAFT",
+            "version": "1.20.4", "plugins": "", "map": "world",
+            "numplayers": str(len(self.players)), "maxplayers": "100",
+            "hostport": str(self.address[1]), "hostip": self.address[0],
+        }
+        body = b"splitnum\x00\x80\x00"
+        for key, value in pairs.items():
+            body += key.encode() + b"\x00" + value.encode() + b"\x00"
+        body += b"\x00\x01player_\x00\x00"
+        for name in self.players:
+            body += name.encode() + b"\x00"
+        body += b"\x00"
+        transport.sendto(b"\x00" + session + body, addr)
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._tcp = await asyncio.start_server(self.handle_status, host, port)
+        port = self._tcp.sockets[0].getsockname()[1]
+        loop = asyncio.get_running_loop()
+        self._udp, _ = await loop.create_datagram_endpoint(
+            lambda: _QueryProtocol(self), local_addr=(host, port))
+        self.address = (host, port)
+        return f"{host}:{port}"
+
+    async def stop(self):
+        if self._udp is not None:
+            self._udp.close()
+        if self._tcp is not None:
+            self._tcp.close()
+            await self._tcp.wait_closed()
+
+
+class _BedrockProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        asyncio.ensure_future(self.server.answer_ping(self.transport, data, addr))
+
+
+class FakeBedrockServer:
+    """Bedrock edition RakNet unconnected-ping responder (UDP)."""
+
+    MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+
+    def __init__(self, latency=0.05, players=7):
+        self.latency = latency
+        self.players = players
+        self.status_requests = 0
+        self._udp = None
+        self.address = None
+
+    async def answer_ping(self, transport, data, addr):
+        if data[:1] != b"\x01":
+            return
+        self.status_requests += 1
+        await asyncio.sleep(self.latency)
+        port = self.address[1]
+        info = f"MCPE;A fake bedrock server;622;1.20.40;{self.players};50;1234567890;Bedrock level;Survival;1;{port};{port};"
+        body = info.encode()
+        transport.sendto(b"\x1c" + data[1:9] + b"\x00" * 8 + self.MAGIC + len(body).to_bytes(2, "big") + body, addr)
+
+    async def start(self, host="127.0.0.1", port=0):
+        loop = asyncio.get_running_loop()
+        self._udp, _ = await loop.create_datagram_endpoint(
+            lambda: _BedrockProtocol(self), local_addr=(host, port))
+        self.address = self._udp.get_extra_info("sockname")[:2]
+        return f"{host}:{self.address[1]}"
+
+    async def stop(self):
+        if self._udp is not None:
+            self._udp.close()
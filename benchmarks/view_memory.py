@@ -0,0 +1,67 @@
+"""Memory held by open /server result views.
+
+Builds N live ServerInfoButtons, each on its own freshly decoded API page (as if the
+page cache had already moved on), once holding the raw JSON dicts the views used to
+keep and once holding ServerRecords, and reports what stays allocated.
+
+    python benchmarks/view_memory.py --views 1000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import tracemalloc
+
+from stubs import make_page
+
+import bot
+
+
+def raw_page(payload):
+    return json.loads(payload)["servers"]
+
+
+def record_page(payload):
+    return [bot.ServerRecord.from_api(server) for server in json.loads(payload)["servers"]]
+
+
+def open_views(count, pages, parse):
+    views = []
+    for index in range(count):
+        page = index + 1
+        servers = parse(pages[index])
+        cursor = bot.ServerCursor({}, start_page=page)
+        cursor.pages[page] = servers
+        views.append(bot.ServerInfoButtons(cursor, servers, page=page))
+    return views
+
+
+def measure(count, pages, parse):
+    gc.collect()
+    tracemalloc.start()
+    views = open_views(count, pages, parse)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for view in views:
+        view.stop()
+    return held, peak
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--views", type=int, default=1000)
+    args = parser.parse_args()
+
+    # Serialized up front so the payload strings are not counted against either mode
+    pages = [json.dumps(make_page(index + 1)) for index in range(args.views)]
+
+    print(f"{args.views} live views, {bot.API_PAGE_SIZE} servers each")
+    print(f"{'holding':<14}{'held MiB':>10}{'peak MiB':>10}{'KiB / view':>12}")
+    for name, parse in (("raw dicts", raw_page), ("ServerRecord", record_page)):
+        held, peak = measure(args.views, pages, parse)
+        print(f"{name:<14}{held / 2**20:>10.1f}{peak / 2**20:>10.1f}{held / args.views / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
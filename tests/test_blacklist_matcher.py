@@ -0,0 +1,24 @@
+import bot
+
+
+def test_removing_one_spelling_keeps_the_other():
+    matcher = bot.BlacklistMatcher(["::1", "0::1"])
+    matcher.remove("0::1")
+    assert "::1" in matcher
+    assert matcher.matches("::1")
+    assert matcher.matches("0:0::1")
+
+
+def test_removing_every_spelling_unblocks_the_address():
+    matcher = bot.BlacklistMatcher(["::1", "0::1"])
+    matcher.remove("0::1")
+    matcher.remove("::1")
+    assert not matcher.matches("::1")
+    assert matcher.stats()["exact"] == 0
+
+
+def test_spelling_added_after_start_is_counted():
+    matcher = bot.BlacklistMatcher(["::1"])
+    matcher.add("0::1")
+    matcher.remove("::1")
+    assert matcher.matches("::1")